@@ -1,14 +1,18 @@
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
-import json
+import heapq
+import msgspec
 import random
+import re
 import asyncio
 from datetime import datetime, timedelta
 from typing import Optional, Dict, List
+import mmap
 import os
 import logging
 import sys
+import time
 
 # Set up logging to stdout only
 handler = logging.StreamHandler(sys.stdout)
@@ -27,67 +31,79 @@ intents.members = True
 
 bot = commands.Bot(command_prefix="!", intents=intents)
 
-# File to store persistent data - read from environment variable or use default
-DATA_FILE = os.getenv("DATA_FILE_PATH", "game_state.json")
+# Precompiled pattern for pulling digit runs out of guess messages
+_DIGITS_RE = re.compile(r'\d+')
 
+# Max number of game names echoed back by /game addkeymulti (keeps the reply under Discord's 2000-char cap)
+PREVIEW_MAX = 20
 
-class GameState:
+# Shared announcement for a round starting or resuming
+ROUND_START_TEMPLATE = (
+    "▶️ **Round {cur}/{tot} {verb}!**\n"
+    "🎮 Game: **{name}**\n"
+    "🎲 Guess a number between **{lo}** and **{hi}**!\n"
+    "⏱️ Time limit: **{t}** minutes\n"
+    "💡 Just type any message with a number in this channel!"
+)
+
+# Directory holding one state file per channel - read from environment variable or use default
+DATA_DIR = os.getenv("DATA_DIR_PATH", "game_data")
+
+# Legacy single-file location, migrated into DATA_DIR on first start
+LEGACY_DATA_FILE = os.getenv("DATA_FILE_PATH", "game_state.json")
+
+
+def _parse_keys(raw: bytes) -> List[tuple]:
+    """Parse 'Game Name Key' lines into (game_name, key) pairs, splitting on the last space"""
+    parsed = []
+    for line in raw.decode('utf-8').splitlines():
+        line = line.strip()
+        if not line or ' ' not in line:
+            continue
+        game_name, key = line.rsplit(' ', 1)
+        parsed.append((game_name.strip(), key.strip()))
+    return parsed
+
+
+def _write_state_atomic(game: 'GameState', path: str):
+    """Encode a game state to a temp file and atomically replace the target"""
+    buf = msgspec.json.format(msgspec.json.encode(game), indent=2)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(buf)
+    os.replace(tmp_path, path)
+
+
+def _decode_game(blob) -> 'GameState':
+    """Decode a persisted GameState, accepting the legacy list-of-dicts key shape"""
+    game = msgspec.json.decode(blob, type=GameState)
+    if not game.game_keys:
+        # Older files stored keys as a list of {game_name, key} dicts, which
+        # the typed decoder ignores; recover them from the raw document
+        legacy = msgspec.json.decode(blob).get("keys")
+        if legacy:
+            game.game_names = [k["game_name"] for k in legacy]
+            game.game_keys = [k["key"] for k in legacy]
+    return game
+
+
+class GameState(msgspec.Struct):
     """Represents the state of a number guessing game for a channel"""
-    
-    def __init__(self, channel_id: int):
-        self.channel_id = channel_id
-        self.active = False
-        self.paused = False
-        self.number = 0
-        self.min_number = 0
-        self.max_number = 500
-        self.timeout_minutes = 10
-        self.end_time = None
-        self.closest_offset = None
-        self.winning_user_id = None
-        self.keys: List[Dict[str, str]] = []  # List of {game_name, key}
-        self.current_round = 0
-        self.total_rounds = 0
-    
-    def to_dict(self):
-        """Convert to dictionary for JSON serialization"""
-        return {
-            "channel_id": self.channel_id,
-            "active": self.active,
-            "paused": self.paused,
-            "number": self.number,
-            "min_number": self.min_number,
-            "max_number": self.max_number,
-            "timeout_minutes": self.timeout_minutes,
-            "end_time": self.end_time.isoformat() if self.end_time else None,
-            "closest_offset": self.closest_offset,
-            "winning_user_id": self.winning_user_id,
-            "keys": self.keys,
-            "current_round": self.current_round,
-            "total_rounds": self.total_rounds
-        }
-    
-    @staticmethod
-    def from_dict(data: dict):
-        """Create GameState from dictionary"""
-        state = GameState(data["channel_id"])
-        state.active = data.get("active", False)
-        state.paused = data.get("paused", False)
-        state.number = data.get("number", 0)
-        state.min_number = data.get("min_number", 0)
-        state.max_number = data.get("max_number", 500)
-        state.timeout_minutes = data.get("timeout_minutes", 10)
-        
-        end_time_str = data.get("end_time")
-        state.end_time = datetime.fromisoformat(end_time_str) if end_time_str else None
-        
-        state.closest_offset = data.get("closest_offset")
-        state.winning_user_id = data.get("winning_user_id")
-        state.keys = data.get("keys", [])
-        state.current_round = data.get("current_round", 0)
-        state.total_rounds = data.get("total_rounds", 0)
-        
-        return state
+
+    channel_id: int
+    active: bool = False
+    paused: bool = False
+    number: int = 0
+    min_number: int = 0
+    max_number: int = 500
+    timeout_minutes: int = 10
+    end_time: Optional[datetime] = None
+    closest_offset: Optional[int] = None
+    winning_user_id: Optional[int] = None
+    game_names: List[str] = []  # Parallel to game_keys: name of the game per round
+    game_keys: List[str] = []   # Parallel to game_names: key/code per round
+    current_round: int = 0
+    total_rounds: int = 0
 
 
 class NumberGuessBot:
@@ -96,70 +112,132 @@ class NumberGuessBot:
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.games: Dict[int, GameState] = {}  # channel_id -> GameState
-        self.load_state()
+        self._dirty_channels: set = set()
+        self._active_channels: set = set()  # Channels with a running, unpaused game
+        self._end_deadlines: Dict[int, float] = {}  # channel_id -> time.monotonic() deadline
+        self._deadlines: List[tuple] = []  # Heap of (deadline, channel_id)
+        self._save_lock = asyncio.Lock()
+        self._loaded = False  # Set once load_state has run (deferred to on_ready)
     
     def load_state(self):
-        """Load game states from JSON file"""
-        if os.path.exists(DATA_FILE):
+        """Load game states from the per-channel JSON files in DATA_DIR"""
+        os.makedirs(DATA_DIR, exist_ok=True)
+        for filename in os.listdir(DATA_DIR):
+            if not filename.endswith('.json'):
+                continue
+            path = os.path.join(DATA_DIR, filename)
             try:
-                with open(DATA_FILE, 'r') as f:
-                    data = json.load(f)
-                    for channel_id_str, game_data in data.items():
-                        channel_id = int(channel_id_str)
-                        self.games[channel_id] = GameState.from_dict(game_data)
-                logger.info(f"Loaded {len(self.games)} game states from {DATA_FILE}")
+                # mmap gives the decoder a zero-copy view backed by the page cache
+                with open(path, 'rb') as f:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        game = _decode_game(memoryview(mm))
+                channel_id = int(filename[:-len('.json')])
+                self.games[channel_id] = game
             except Exception as e:
-                logger.error(f"Error loading state: {e}", exc_info=True)
+                logger.error(f"Error loading state from {path}: {e}", exc_info=True)
+
+        if not self.games and os.path.exists(LEGACY_DATA_FILE):
+            self._migrate_legacy_state()
+
+        self._active_channels = {channel_id for channel_id, game in self.games.items()
+                                 if game.active and not game.paused}
+        for channel_id in self._active_channels:
+            game = self.games[channel_id]
+            if game.end_time:
+                # Rebuild the monotonic deadline from the persisted wall-clock time
+                self.schedule_timeout(game, time.monotonic() + (game.end_time - datetime.now()).total_seconds())
+
+        self._loaded = True
+
+        if self.games:
+            logger.info(f"Loaded {len(self.games)} game states from {DATA_DIR}")
         else:
-            logger.info(f"No existing state file found, starting fresh")
-    
-    def save_state(self):
-        """Save game states to JSON file"""
+            logger.info(f"No existing state files found, starting fresh")
+
+    def _migrate_legacy_state(self):
+        """Import the old single-file state into per-channel files"""
         try:
-            data = {str(channel_id): state.to_dict() 
-                   for channel_id, state in self.games.items()}
-            with open(DATA_FILE, 'w') as f:
-                json.dump(data, f, indent=2)
+            with open(LEGACY_DATA_FILE, 'rb', buffering=0) as f:
+                data = msgspec.json.decode(f.read())
+            for channel_id_str, game_data in data.items():
+                channel_id = int(channel_id_str)
+                game = _decode_game(msgspec.json.encode(game_data))
+                self.games[channel_id] = game
+                _write_state_atomic(game, os.path.join(DATA_DIR, f"{channel_id}.json"))
+            os.replace(LEGACY_DATA_FILE, LEGACY_DATA_FILE + '.migrated')
+            logger.info(f"Migrated {len(self.games)} game states from {LEGACY_DATA_FILE} to {DATA_DIR}")
         except Exception as e:
-            logger.error(f"Error saving state: {e}", exc_info=True)
+            logger.error(f"Error migrating legacy state: {e}", exc_info=True)
+    
+    def save_state(self, channel_id: int):
+        """Mark a channel's state as dirty; the flush_state loop writes it in the background"""
+        game = self.games.get(channel_id)
+        if game is not None:
+            if game.active and not game.paused:
+                self._active_channels.add(channel_id)
+            else:
+                self._active_channels.discard(channel_id)
+                self._end_deadlines.pop(channel_id, None)
+        self._dirty_channels.add(channel_id)
+
+    async def flush_state(self):
+        """Write the state of any channel that changed since the last flush"""
+        if not self._dirty_channels:
+            return
+        async with self._save_lock:
+            dirty = self._dirty_channels
+            self._dirty_channels = set()
+            for channel_id in dirty:
+                game = self.games.get(channel_id)
+                if game is None:
+                    continue
+                try:
+                    path = os.path.join(DATA_DIR, f"{channel_id}.json")
+                    await asyncio.to_thread(_write_state_atomic, game, path)
+                except Exception as e:
+                    logger.error(f"Error saving state for channel {channel_id}: {e}", exc_info=True)
     
+    def schedule_timeout(self, game: GameState, deadline: Optional[float] = None):
+        """Set a game's monotonic deadline (default: a full round timeout) and register it with the heap"""
+        if deadline is None:
+            deadline = time.monotonic() + game.timeout_minutes * 60
+        self._end_deadlines[game.channel_id] = deadline
+        heapq.heappush(self._deadlines, (deadline, game.channel_id))
+
     def get_or_create_game(self, channel_id: int) -> GameState:
         """Get existing game state or create new one for channel"""
         if channel_id not in self.games:
             self.games[channel_id] = GameState(channel_id)
-            self.save_state()
         return self.games[channel_id]
     
     async def process_message(self, message: discord.Message):
         """Process a message for number guessing"""
-        if message.author.bot:
+        if not self._loaded or message.author.bot:
             return
-        
+
+        # Single set lookup covers "no game here" and "game inactive/paused"
         channel_id = message.channel.id
-        if channel_id not in self.games:
+        if channel_id not in self._active_channels:
             return
-        
+
         game = self.games[channel_id]
-        
-        if not game.active or game.paused:
-            return
-        
+
         # Check if game has timed out
-        if game.end_time and datetime.now() >= game.end_time:
+        deadline = self._end_deadlines.get(channel_id)
+        if deadline and time.monotonic() >= deadline:
             await self.finalize_round(message.channel, game)
             return
         
-        # Extract numbers from message
-        number_str = ''.join(c for c in message.content if c.isdigit())
-        
-        if not number_str:
+        # Extract numbers from message (all digit runs concatenated, as before)
+        if not message.content:
             return
-        
-        try:
-            guessed_number = int(number_str)
-        except ValueError:
+
+        digit_runs = _DIGITS_RE.findall(message.content)
+        if not digit_runs:
             return
-        
+
+        guessed_number = int(''.join(digit_runs))
+
         # Check if number is in valid range
         if guessed_number < game.min_number or guessed_number > game.max_number:
             return
@@ -172,7 +250,7 @@ class NumberGuessBot:
             logger.info(f"Game progressed: {game.closest_offset} -> {offset}, by {message.author.name} ({message.author.id}) in channel {channel_id}")
             game.closest_offset = offset
             game.winning_user_id = message.author.id
-            self.save_state()
+            self.save_state(channel_id)
             
             # Check if exact match
             if offset == 0:
@@ -181,7 +259,10 @@ class NumberGuessBot:
     async def finalize_round(self, channel: discord.TextChannel, game: GameState):
         """Finalize the current round of the game"""
         game.active = False
-        
+        # Drop out of the message fast path before the first await, or a
+        # message arriving mid-finalize would re-enter via the expired deadline
+        self._active_channels.discard(game.channel_id)
+
         if game.winning_user_id:
             # Announce winner
             if game.closest_offset == 0:
@@ -189,27 +270,34 @@ class NumberGuessBot:
             else:
                 accuracy_msg = f"The hidden number was **{game.number}**. The user was **{game.closest_offset}** off!"
             
-            await channel.send(
+            # Run the announcement concurrently with the DM; both are independent REST calls
+            announce_task = asyncio.create_task(channel.send(
                 f"🎉 User <@{game.winning_user_id}> won round {game.current_round}/{game.total_rounds}! {accuracy_msg}"
-            )
-            
+            ))
+
             # Send reward key via DM
-            if game.current_round <= len(game.keys):
-                key_info = game.keys[game.current_round - 1]
+            dm_error = None
+            if game.current_round <= len(game.game_keys):
+                round_idx = game.current_round - 1
                 try:
-                    user = await self.bot.fetch_user(game.winning_user_id)
+                    # Cached lookup first; only hit the REST API on a cache miss
+                    user = self.bot.get_user(game.winning_user_id) or await self.bot.fetch_user(game.winning_user_id)
                     dm_channel = await user.create_dm()
                     await dm_channel.send(
                         f"🎁 **Congratulations!** You won round {game.current_round}!\n\n"
-                        f"**Game:** {key_info['game_name']}\n"
-                        f"**Key:** `{key_info['key']}`"
+                        f"**Game:** {game.game_names[round_idx]}\n"
+                        f"**Key:** `{game.game_keys[round_idx]}`"
                     )
                 except discord.Forbidden:
-                    await channel.send(f"❌ Failed to send DM to <@{game.winning_user_id}>. Please enable DMs.")
+                    dm_error = f"❌ Failed to send DM to <@{game.winning_user_id}>. Please enable DMs."
                     logger.warning(f"Failed to send DM to user {game.winning_user_id}: DMs disabled")
                 except Exception as e:
                     logger.error(f"Error sending DM to user {game.winning_user_id}: {e}", exc_info=True)
-                    await channel.send(f"❌ Failed to send message to <@{game.winning_user_id}>")
+                    dm_error = f"❌ Failed to send message to <@{game.winning_user_id}>"
+
+            await announce_task
+            if dm_error:
+                await channel.send(dm_error)
         else:
             await channel.send(f"⏰ Round {game.current_round}/{game.total_rounds} ended with no winner!")
         
@@ -219,24 +307,22 @@ class NumberGuessBot:
             self.start_round(game)
             
             # Get the game name for this round
-            game_name = game.keys[game.current_round - 1]['game_name'] if game.current_round <= len(game.keys) else "Unknown"
-            
-            await channel.send(
-                f"▶️ **Round {game.current_round}/{game.total_rounds} Starting!**\n"
-                f"🎮 Game: **{game_name}**\n"
-                f"🎲 Guess a number between **{game.min_number}** and **{game.max_number}**!\n"
-                f"⏱️ Time limit: **{game.timeout_minutes}** minutes\n"
-                f"💡 Just type any message with a number in this channel!"
-            )
+            game_name = game.game_names[game.current_round - 1] if game.current_round <= len(game.game_names) else "Unknown"
+
+            await channel.send(ROUND_START_TEMPLATE.format(
+                cur=game.current_round, tot=game.total_rounds, verb="Starting",
+                name=game_name, lo=game.min_number, hi=game.max_number, t=game.timeout_minutes
+            ))
         else:
             # Game completely finished
             await channel.send("🏁 All rounds completed! Game over.")
             game.paused = False
             game.current_round = 0
             game.total_rounds = 0
-            game.keys = []
+            game.game_names = []
+            game.game_keys = []
         
-        self.save_state()
+        self.save_state(game.channel_id)
     
     def start_round(self, game: GameState):
         """Start a new round"""
@@ -247,7 +333,8 @@ class NumberGuessBot:
         game.end_time = datetime.now() + timedelta(minutes=game.timeout_minutes)
         game.active = True
         game.paused = False
-        self.save_state()
+        self.schedule_timeout(game)
+        self.save_state(game.channel_id)
         
         logger.info(f"Round {game.current_round}/{game.total_rounds} started in channel {game.channel_id}. Number is {game.number}")
 
@@ -259,10 +346,26 @@ number_guess_bot = NumberGuessBot(bot)
 game_group = app_commands.Group(name="game", description="Number guessing game commands")
 
 
+async def _ensure_loaded(interaction: discord.Interaction) -> bool:
+    """Reject commands that arrive before the persisted state has finished loading"""
+    if number_guess_bot._loaded:
+        return True
+    await interaction.response.send_message(
+        "⏳ Bot is still starting up, please try again in a moment!",
+        ephemeral=True
+    )
+    return False
+
+
 @bot.event
 async def on_ready():
     logger.info(f'Logged in as {bot.user.name} ({bot.user.id})')
-    
+
+    # Load persisted state off the event loop; the gateway connects without
+    # waiting on disk I/O and messages are ignored until this completes
+    if not number_guess_bot._loaded:
+        await asyncio.to_thread(number_guess_bot.load_state)
+
     # Add the game group to the command tree
     bot.tree.add_command(game_group)
     
@@ -272,29 +375,44 @@ async def on_ready():
     except Exception as e:
         logger.error(f"Failed to sync commands: {e}", exc_info=True)
     
-    # Start background task to check for timeouts
+    # Start background tasks to check for timeouts and flush state to disk
     check_timeouts.start()
+    flush_state.start()
 
 
 @bot.event
 async def on_message(message: discord.Message):
     """Handle incoming messages"""
     await number_guess_bot.process_message(message)
-    await bot.process_commands(message)
+    # All commands here are slash commands; only run the prefix-command
+    # pipeline for messages that could actually be one
+    if message.content.startswith("!"):
+        await bot.process_commands(message)
+
+
+@tasks.loop(seconds=2)
+async def flush_state():
+    """Background task to flush dirty game state to disk, coalescing bursts of writes"""
+    await number_guess_bot.flush_state()
 
 
 @tasks.loop(seconds=5)
 async def check_timeouts():
     """Background task to check for game timeouts"""
-    for channel_id, game in list(number_guess_bot.games.items()):
-        if game.active and not game.paused and game.end_time:
-            if datetime.now() >= game.end_time:
-                try:
-                    channel = bot.get_channel(channel_id)
-                    if channel:
-                        await number_guess_bot.finalize_round(channel, game)
-                except Exception as e:
-                    logger.error(f"Error checking timeout for channel {channel_id}: {e}", exc_info=True)
+    heap = number_guess_bot._deadlines
+    now = time.monotonic()
+    while heap and heap[0][0] <= now:
+        deadline, channel_id = heapq.heappop(heap)
+        game = number_guess_bot.games.get(channel_id)
+        # Skip stale entries from rounds that already ended or were rescheduled
+        if not game or not game.active or game.paused or number_guess_bot._end_deadlines.get(channel_id) != deadline:
+            continue
+        try:
+            channel = bot.get_channel(channel_id)
+            if channel:
+                await number_guess_bot.finalize_round(channel, game)
+        except Exception as e:
+            logger.error(f"Error checking timeout for channel {channel_id}: {e}", exc_info=True)
 
 
 @game_group.command(name="init", description="Initialize game settings for this channel")
@@ -319,6 +437,9 @@ async def game_init(
         await interaction.response.send_message("❌ Timeout must be between 1 and 60 minutes!", ephemeral=True)
         return
     
+    if not await _ensure_loaded(interaction):
+        return
+
     game = number_guess_bot.get_or_create_game(interaction.channel_id)
     
     if game.active:
@@ -334,7 +455,7 @@ async def game_init(
     game.closest_offset = 0
     game.current_round = 0
     game.total_rounds = 0
-    number_guess_bot.save_state()
+    number_guess_bot.save_state(game.channel_id)
     
     await interaction.response.send_message(
         f"✅ Game settings updated!\n"
@@ -353,33 +474,33 @@ async def game_addkeymulti(
     file: discord.Attachment
 ):
     """Add multiple game keys from a file"""
+    if not await _ensure_loaded(interaction):
+        return
+
     game = number_guess_bot.get_or_create_game(interaction.channel_id)
     
     try:
-        file_content = await file.read()
-        lines = file_content.decode('utf-8').splitlines()
-        prettyprint = []
-        
-        added_count = 0
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            # Split on the last space to separate game name and key
-            if ' ' not in line:
-                continue
-            game_name, key = line.rsplit(' ', 1)
-            game.keys.append({"game_name": game_name.strip(), "key": key.strip()})
-            added_count += 1
-            prettyprint.append(f"- {game_name.strip()}")
-        
+        raw = await file.read()
+        # Parse off the event loop; large key files shouldn't stall the gateway
+        parsed = await asyncio.to_thread(_parse_keys, raw)
+
+        for game_name, key in parsed:
+            game.game_names.append(game_name)
+            game.game_keys.append(key)
+        added_count = len(parsed)
+
+        # Only echo back a bounded preview of the added games
+        preview_text = '\n'.join(f"- {game_name}" for game_name, _ in parsed[:PREVIEW_MAX])
+        if added_count > PREVIEW_MAX:
+            preview_text += f"\n… and {added_count - PREVIEW_MAX} more"
+
         if game.active:
             game.total_rounds += added_count
 
-        number_guess_bot.save_state()
+        number_guess_bot.save_state(game.channel_id)
         
         await interaction.response.send_message(
-            f"✅ Added {added_count} keys! Total keys: **{len(game.keys)}**\n{'\n'.join(prettyprint)}",
+            f"✅ Added {added_count} keys! Total keys: **{len(game.game_keys)}**\n{preview_text}",
             ephemeral=True
         )
 
@@ -402,16 +523,20 @@ async def game_addkey(
     key: str
 ):
     """Add a game key"""
+    if not await _ensure_loaded(interaction):
+        return
+
     game = number_guess_bot.get_or_create_game(interaction.channel_id)
     
     if game.active:
         game.total_rounds += 1
     
-    game.keys.append({"game_name": game_name, "key": key})
-    number_guess_bot.save_state()
+    game.game_names.append(game_name)
+    game.game_keys.append(key)
+    number_guess_bot.save_state(game.channel_id)
     
     await interaction.response.send_message(
-        f"✅ Added key for **{game_name}**! Total keys: **{len(game.keys)}**",
+        f"✅ Added key for **{game_name}**! Total keys: **{len(game.game_keys)}**",
         ephemeral=True
     )
 
@@ -420,36 +545,51 @@ async def game_addkey(
 @app_commands.checks.has_permissions(manage_messages=True)
 async def game_listkeys(interaction: discord.Interaction):
     """List all keys (for debugging/admin)"""
+    if not await _ensure_loaded(interaction):
+        return
+
     game = number_guess_bot.get_or_create_game(interaction.channel_id)
     
-    if not game.keys:
+    if not game.game_keys:
         await interaction.response.send_message("📭 No keys added yet!", ephemeral=True)
         return
     
-    key_list = "\n".join([f"{i+1}. **{k['game_name']}**: `{k['key']}`" 
-                          for i, k in enumerate(game.keys)])
-    
-    await interaction.response.send_message(
-        f"🔑 **Game Keys ({len(game.keys)} total):**\n{key_list}",
-        ephemeral=True
-    )
+    # Chunk the list so large key sets don't hit Discord's 2000-char message cap
+    chunks = []
+    current = f"🔑 **Game Keys ({len(game.game_keys)} total):**"
+    for line in (f"{i}. **{name}**: `{key}`"
+                 for i, (name, key) in enumerate(zip(game.game_names, game.game_keys), 1)):
+        if len(current) + 1 + len(line) > 1900:
+            chunks.append(current)
+            current = line
+        else:
+            current += "\n" + line
+    chunks.append(current)
+
+    await interaction.response.send_message(chunks[0], ephemeral=True)
+    for chunk in chunks[1:]:
+        await interaction.followup.send(chunk, ephemeral=True)
 
 
 @game_group.command(name="clearkeys", description="Clear all game keys")
 @app_commands.checks.has_permissions(manage_messages=True)
 async def game_clearkeys(interaction: discord.Interaction):
     """Clear all keys"""
+    if not await _ensure_loaded(interaction):
+        return
+
     game = number_guess_bot.get_or_create_game(interaction.channel_id)
     
     if game.active:
         await interaction.response.send_message("❌ Cannot clear keys while a game is active!", ephemeral=True)
         return
     
-    count = len(game.keys)
-    game.keys = []
+    count = len(game.game_keys)
+    game.game_names = []
+    game.game_keys = []
     game.current_round = 0
     game.total_rounds = 0
-    number_guess_bot.save_state()
+    number_guess_bot.save_state(game.channel_id)
     
     await interaction.response.send_message(f"🗑️ Cleared {count} key(s)!", ephemeral=True)
 
@@ -458,9 +598,12 @@ async def game_clearkeys(interaction: discord.Interaction):
 @app_commands.checks.has_permissions(manage_messages=True)
 async def game_start(interaction: discord.Interaction):
     """Start or resume the game"""
+    if not await _ensure_loaded(interaction):
+        return
+
     game = number_guess_bot.get_or_create_game(interaction.channel_id)
     
-    if not game.keys:
+    if not game.game_keys:
         await interaction.response.send_message("❌ No keys added! Use `/game_addkey` first.", ephemeral=True)
         return
     
@@ -473,20 +616,18 @@ async def game_start(interaction: discord.Interaction):
         game.end_time = datetime.now() + timedelta(minutes=game.timeout_minutes)
         game.active = True
         game.paused = False
-        number_guess_bot.save_state()
+        number_guess_bot.schedule_timeout(game)
+        number_guess_bot.save_state(game.channel_id)
         
         logger.info(f"Round {game.current_round}/{game.total_rounds} resumed in channel {interaction.channel_id}. Number is {game.number}")
         
         # Get the game name for this round
-        game_name = game.keys[game.current_round - 1]['game_name'] if game.current_round <= len(game.keys) else "Unknown"
+        game_name = game.game_names[game.current_round - 1] if game.current_round <= len(game.game_names) else "Unknown"
         
-        await interaction.response.send_message(
-            f"▶️ **Round {game.current_round}/{game.total_rounds} Resumed!**\n"
-            f"🎮 Game: **{game_name}**\n"
-            f"🎲 Guess a number between **{game.min_number}** and **{game.max_number}**!\n"
-            f"⏱️ Time limit: **{game.timeout_minutes}** minutes\n"
-            f"💡 Just type any message with a number in this channel!"
-        )
+        await interaction.response.send_message(ROUND_START_TEMPLATE.format(
+            cur=game.current_round, tot=game.total_rounds, verb="Resumed",
+            name=game_name, lo=game.min_number, hi=game.max_number, t=game.timeout_minutes
+        ))
         return
     
     # If game is already active
@@ -495,21 +636,20 @@ async def game_start(interaction: discord.Interaction):
         return
     
     # Start new game
-    game.total_rounds = len(game.keys)
+    game.total_rounds = len(game.game_keys)
     game.current_round = 0
     number_guess_bot.start_round(game)
     
     # Get the game name for round 1
-    game_name = game.keys[0]['game_name'] if len(game.keys) > 0 else "Unknown"
+    game_name = game.game_names[0] if game.game_names else "Unknown"
     
     await interaction.response.send_message(
         f"🎮 **Number Guessing Game Started!**\n"
         f"🏆 Total rounds: **{game.total_rounds}**\n\n"
-        f"▶️ **Round 1/{game.total_rounds}**\n"
-        f"🎮 Game: **{game_name}**\n"
-        f"🎲 Guess a number between **{game.min_number}** and **{game.max_number}**!\n"
-        f"⏱️ Time limit: **{game.timeout_minutes}** minutes per round\n"
-        f"💡 Just type any message with a number in this channel!"
+        + ROUND_START_TEMPLATE.format(
+            cur=1, tot=game.total_rounds, verb="Starting",
+            name=game_name, lo=game.min_number, hi=game.max_number, t=game.timeout_minutes
+        )
     )
 
 
@@ -517,6 +657,9 @@ async def game_start(interaction: discord.Interaction):
 @app_commands.checks.has_permissions(manage_messages=True)
 async def game_pause(interaction: discord.Interaction):
     """Pause the game"""
+    if not await _ensure_loaded(interaction):
+        return
+
     game = number_guess_bot.get_or_create_game(interaction.channel_id)
     
     if not game.active and not game.paused:
@@ -530,7 +673,7 @@ async def game_pause(interaction: discord.Interaction):
     # Immediately pause the current round
     game.active = False
     game.paused = True
-    number_guess_bot.save_state()
+    number_guess_bot.save_state(game.channel_id)
     
     await interaction.response.send_message(
         f"⏸️ **Game Paused!**\n"
@@ -543,6 +686,9 @@ async def game_pause(interaction: discord.Interaction):
 @app_commands.checks.has_permissions(manage_messages=True)
 async def game_stop(interaction: discord.Interaction):
     """Force stop the game"""
+    if not await _ensure_loaded(interaction):
+        return
+
     game = number_guess_bot.get_or_create_game(interaction.channel_id)
     
     if not game.active and not game.paused:
@@ -553,7 +699,7 @@ async def game_stop(interaction: discord.Interaction):
     game.paused = False
     game.current_round = 0
     game.total_rounds = 0
-    number_guess_bot.save_state()
+    number_guess_bot.save_state(game.channel_id)
     
     await interaction.response.send_message("🛑 Game stopped!")
 
@@ -562,12 +708,15 @@ async def game_stop(interaction: discord.Interaction):
 @app_commands.checks.has_permissions(manage_messages=True)
 async def game_status(interaction: discord.Interaction):
     """Check game status"""
+    if not await _ensure_loaded(interaction):
+        return
+
     game = number_guess_bot.get_or_create_game(interaction.channel_id)
     
     if not game.active and not game.paused:
         await interaction.response.send_message(
             f"📊 **Game Status: Inactive**\n"
-            f"Keys loaded: **{len(game.keys)}**\n"
+            f"Keys loaded: **{len(game.game_keys)}**\n"
             f"Settings: **{game.min_number}** to **{game.max_number}**, **{game.timeout_minutes}** min timeout"
         )
         return
@@ -623,8 +772,16 @@ if __name__ == "__main__":
             sys.exit(1)
         TOKEN = sys.argv[1]
     
-    logger.info(f"Using data file: {DATA_FILE}")
-    
+    logger.info(f"Using data directory: {DATA_DIR}")
+
+    # Use uvloop's libuv-based event loop when available (not on Windows)
+    try:
+        import uvloop
+        uvloop.install()
+        logger.info("Using uvloop event loop")
+    except ImportError:
+        pass
+
     try:
         bot.run(TOKEN)
     except Exception as e: